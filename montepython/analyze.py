@@ -176,8 +176,10 @@ def prepare(files, info):
     # that can then be analyzed.
     modules = ['nested_sampling', 'cosmo_hammer']
     tags = ['NS', 'CH']
-    for module_name, tag in zip(modules, tags):
-        action_done = clean_conversion(module_name, tag, files[0])
+    # Options of the conversion routine of each module
+    options = [{'binary': info.save_npy}, {}]
+    for module_name, tag, kwargs in zip(modules, tags, options):
+        action_done = clean_conversion(module_name, tag, files[0], **kwargs)
         if action_done:
             return False
 
@@ -1053,10 +1055,13 @@ def read_histogram_2d(histogram_path):
     return x_centers, y_centers, extent, hist
 
 
-def clean_conversion(module_name, tag, folder):
+def clean_conversion(module_name, tag, folder, **kwargs):
     """
     Execute the methods "convert" from the different sampling algorithms
 
+    Additional keyword arguments are passed to the conversion routine of the
+    module.
+
     Returns True if something was made, False otherwise
     """
     has_module = False
@@ -1075,7 +1080,8 @@ def clean_conversion(module_name, tag, folder):
             *[elem for elem in folder.split(os.path.sep) if elem])
         if folder.split(os.path.sep)[-1] == subfolder:
             try:
-                getattr(module, 'from_%s_output_to_chains' % tag)(folder)
+                getattr(module, 'from_%s_output_to_chains' % tag)(
+                    folder, **kwargs)
             except IOError:
                 raise io_mp.AnalyzeError(
                     "You asked to analyze a %s folder which " % tag +
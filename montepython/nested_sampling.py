@@ -17,7 +17,7 @@ internally two functions, :func:`prior() <nested_sampling.prior>` and
 from pymultinest import run as nested_run
 import numpy as np
 import os
-from copy import copy
+import re
 import warnings
 import io_mp
 import sampler
@@ -39,8 +39,19 @@ name_paramnames = '.paramnames'            # in the NS/ subfolder
 name_arguments  = '.arguments'             # in the NS/ subfolder
 name_chain_acc  = 'chain_NS__accepted.txt' # in the chain root folder
 name_chain_rej  = 'chain_NS__rejected.txt' # in the chain root folder
+name_chain_acc_npy = 'chain_NS__accepted.npy' # binary copy of the above
 # Log.param name (ideally, we should import this one from somewhere else)
 name_logparam = 'log.param'
+# Uncommented parameter line of log.param: captures the name and the values
+re_logparam_line = re.compile(
+    r"""^\s*data\.parameters\[\s*['"]([^'"]+)['"]\s*\]\s*=\s*\[(.*)\]""")
+# Classification of the lines of stats.dat that carry information
+re_stats_line = re.compile(
+    r"(?P<logZ>^Nested Sampling Global Log-Evidence)|"
+    r"(?P<n_modes>^Total Modes Found)|(?P<mode>^Mode)|"
+    r"(?P<sigma>Sigma)|(?P<MAP>MAP)")
+# Template of the parameter lines written in the log.param of each mode
+logparam_line = "data.parameters['%s'] = [%s, %s, %s, %s, %s, %s]\n"
 
 # Multinest option prefix
 NS_prefix       = 'NS_'
@@ -245,15 +256,22 @@ def run(cosmo, data, command_line):
     derived_param_names = data.get_mcmc_parameters(['derived'])
     NS_param_names      = data.NS_param_names
 
+    # References to the parameters and prior maps, looked up once here instead
+    # of at every call of the prior and likelihood functions
+    varying_params = [data.mcmc_parameters[name] for name in NS_param_names]
+    varying_priors = [param['prior'].map_from_unit_interval
+                      for param in varying_params]
+    derived_params = [data.mcmc_parameters[name]
+                      for name in derived_param_names]
+
     # Function giving the prior probability
     def prior(cube, ndim, *args):
         """
         Please see the encompassing function docstring
 
         """
-        for i, name in zip(range(ndim), NS_param_names):
-            cube[i] = data.mcmc_parameters[name]['prior']\
-                .map_from_unit_interval(cube[i])
+        for i, map_from_unit_interval in zip(range(ndim), varying_priors):
+            cube[i] = map_from_unit_interval(cube[i])
 
     # Function giving the likelihood probability
     def loglike(cube, ndim, *args):
@@ -262,13 +280,13 @@ def run(cosmo, data, command_line):
 
         """
         # Updates values: cube --> data
-        for i, name in zip(range(ndim), NS_param_names):
-            data.mcmc_parameters[name]['current'] = cube[i]
+        for i, param in zip(range(ndim), varying_params):
+            param['current'] = cube[i]
         # Propagate the information towards the cosmo arguments
         data.update_cosmo_arguments()
         lkl = sampler.compute_lkl(cosmo, data)
-        for i, name in enumerate(derived_param_names):
-            cube[ndim+i] = data.mcmc_parameters[name]['current']
+        for i, param in enumerate(derived_params):
+            cube[ndim+i] = param['current']
         return lkl
 
     # Launch MultiNest, and recover the output code
@@ -284,7 +302,118 @@ def run(cosmo, data, command_line):
                       'chain_name/mode_# subfolders.')
 
 
-def from_NS_output_to_chains(folder):
+def iter_blank_separated(lines):
+    """
+    Yield the blocks of consecutive non-blank lines, joined in one string
+
+    Used to read the modes of the 'post_separate.dat' file one by one, without
+    building an intermediate copy of the whole file. Any number of blank or
+    whitespace-only lines separates two blocks.
+
+    >>> list(iter_blank_separated(['1 2\\n', '3 4\\n', '\\n', '5 6\\n']))
+    ['1 2\\n3 4\\n', '5 6\\n']
+    >>> list(iter_blank_separated(['\\n', '1 2\\n', ' \\t\\n', '\\n', '3 4']))
+    ['1 2\\n', '3 4']
+    >>> list(iter_blank_separated(['\\n', '\\n']))
+    []
+
+    """
+    block = []
+    for line in lines:
+        if line.strip():
+            block.append(line)
+        elif block:
+            yield ''.join(block)
+            block = []
+    if block:
+        yield ''.join(block)
+
+
+def read_NS_table(path, columns):
+    """
+    Read a whitespace-separated numerical table written by MultiNest
+
+    The C parser of the pandas library is several times faster than
+    :func:`numpy.loadtxt` on the large MultiNest output files, so it is used
+    when available, falling back to :func:`numpy.loadtxt` otherwise.
+
+    As in :func:`read_NS_mode`, a table with lines of the wrong length (e.g.
+    the last line of a killed run) or with malformed numbers raises an
+    :class:`io_mp.AnalyzeError`. In particular, pandas is told to read only
+    literal NaNs as such, instead of filling the missing fields with NaN.
+
+    """
+    try:
+        from pandas import read_csv
+    except ImportError:
+        read_csv = None
+    try:
+        if read_csv is None:
+            table = np.loadtxt(path, ndmin=2)
+        else:
+            table = read_csv(path, sep=r'\s+', header=None, comment='#',
+                             dtype=np.float64, keep_default_na=False,
+                             na_values=['nan', 'NaN', 'NAN']).values
+    except ValueError:
+        table = None
+    if table is None or table.shape[1] != columns:
+        raise io_mp.AnalyzeError(
+            "Could not read lines of %d numbers in %s: " % (columns, path) +
+            "a line has a wrong number of columns, or a malformed number.")
+    return table
+
+
+def read_NS_mode(text, columns):
+    """
+    Parse the samples of one mode of the 'post_separate.dat' file
+
+    The text is parsed directly by :func:`numpy.fromstring`, which stops at the
+    first malformed number (e.g. a Fortran exponent without 'E', as in
+    '0.1234-310') instead of failing. The number of values read is therefore
+    checked against the number of lines.
+
+    >>> read_NS_mode('1 2 3\\n4 5 6\\n', 3).shape
+    (2, 3)
+
+    """
+    n_lines = text.count('\n') + (0 if text.endswith('\n') else 1)
+    with warnings.catch_warnings():
+        # Depending on the version, numpy raises a ValueError or only issues a
+        # DeprecationWarning when the text could not be read to its end
+        warnings.simplefilter('error', DeprecationWarning)
+        try:
+            mode_data = np.fromstring(text, sep=' ', dtype=np.float64)
+        except (ValueError, DeprecationWarning):
+            mode_data = np.empty(0)
+    if mode_data.size != n_lines*columns:
+        raise io_mp.AnalyzeError(
+            "Could not read %d lines of %d numbers " % (n_lines, columns) +
+            "in the MultiNest output: a line has a wrong number of " +
+            "columns, or a malformed number.")
+    return mode_data.reshape(-1, columns)
+
+
+def write_NS_table(path, array):
+    """
+    Write a numerical table as a Monte Python chain
+
+    The output is equivalent to that of :func:`numpy.savetxt` with format
+    '%.6e', but pandas does the formatting in one C call instead of one Python
+    call per row, so it is used when available. Non-finite values are written
+    as 'nan' and 'inf' in both cases: pandas would otherwise leave an empty
+    field, shifting the remaining columns of the row.
+
+    """
+    try:
+        from pandas import DataFrame
+    except ImportError:
+        np.savetxt(path, array, fmt='%.6e')
+        return
+    DataFrame(array).to_csv(path, sep=' ', header=False, index=False,
+                            float_format='%.6e', na_rep='nan')
+
+
+def from_NS_output_to_chains(folder, binary=False):
     """
     Translate the output of MultiNest into readable output for Monte Python
 
@@ -299,6 +428,20 @@ def from_NS_output_to_chains(folder):
 
     The mono-modal case is treated as a special case of the multi-modal one.
 
+    If requested (flag `--save-npy` of the analysis), a binary copy of each
+    text chain is stored as well in NumPy's '.npy' format, that can be loaded
+    with :func:`numpy.load`. It is not picked up by the :mod:`analyze` module,
+    which only considers '.txt' files.
+
+    Parameters
+    ----------
+    folder : str
+        Path to the NS subfolder of the chain folder
+    binary : bool
+        Whether to store the binary copy of the chains. It is written in
+        double precision, i.e. without losing any digit of the MultiNest
+        output, contrary to the 7 significant digits of the text chains.
+
     """
     chain_name = [a for a in folder.split(os.path.sep) if a][-2]
     base_name = os.path.join(folder, chain_name)
@@ -309,8 +452,7 @@ def from_NS_output_to_chains(folder):
     NS_arguments = {}
     with open(base_name+name_arguments, 'r') as afile:
         for line in afile:
-            arg   = line.split('=')[0].strip()
-            value = line.split('=')[1].strip()
+            arg, value = [a.strip() for a in line.split('=', 1)]
             arg_type = (NS_user_arguments[arg]['type']
                         if arg in NS_user_arguments else
                         NS_auto_arguments[arg]['type'])
@@ -320,7 +462,8 @@ def from_NS_output_to_chains(folder):
             NS_arguments[arg] = value
     multimodal = NS_arguments.get('multimodal')
     # Read parameters order
-    NS_param_names = np.loadtxt(base_name+name_paramnames, dtype='str').tolist()
+    with open(base_name+name_paramnames, 'r') as pfile:
+        NS_param_names = pfile.read().split()
     # In multimodal case, if there were no clustering params specified, ALL are
     if multimodal and not NS_arguments.get('clustering_params'):
         NS_arguments['clustering_params'] = NS_param_names
@@ -333,57 +476,78 @@ def from_NS_output_to_chains(folder):
     param_names = []
     param_lines = {}
     param_data  = {}
-    pre, pos = 'data.parameters[', ']'
     for i, line in enumerate(log_lines):
-        if pre in line:
-            if line.strip()[0] == '#':
-                continue
-            param_name = line.split('=')[0][line.find(pre)+len(pre):
-                                            line.find(pos)]
-            param_name = param_name.replace('"','').replace("'",'').strip()
+        match = re_logparam_line.match(line)
+        if match:
+            param_name, values = match.groups()
             param_names.append(param_name)
-            param_data[param_name] = [a.strip() for a in
-                                      line.split('=')[1].strip('[]').split(',')]
+            param_data[param_name] = [a.strip() for a in values.split(',')]
             param_lines[param_name] = i
 
-    # Create the mapping from NS ordering to log.param ordering
-    columns_reorder = [NS_param_names.index(param) for param in param_names]
+    # Create the mapping from NS ordering to log.param ordering (chain columns,
+    # i.e. shifted by the two first ones, sample-prob and -loglik)
+    NS_param_index = dict((param, j) for j, param in enumerate(NS_param_names))
+    columns_reorder = [2+NS_param_index[param] for param in param_names]
+    # Position of the parameters in the reordered chains, and quick membership
+    # test for the clustering ones
+    param_index = dict((param, j) for j, param in enumerate(param_names))
+    clustering_params = frozenset(NS_arguments.get('clustering_params', []))
 
     # Open the 'stats.dat' file to see what happened and retrieve some info
-    stats_file = open(base_name+name_stats, 'r')
-    lines = stats_file.readlines()
-    stats_file.close()
-    # Mode-separated info
-    i = 0
+    # Mode-separated info, and position in each mode of the first line of the
+    # sigmas and of the MAP values
     n_modes = 0
-    stats_mode_lines = {0: []}
-    for line in lines:
-        if 'Nested Sampling Global Log-Evidence' in line:
-            global_logZ, global_logZ_err = [float(a.strip()) for a in
-                                            line.split(':')[1].split('+/-')]
-        if 'Total Modes Found' in line:
-            n_modes = int(line.split(':')[1].strip())
-        if line[:4] == 'Mode':
-            i += 1
-            stats_mode_lines[i] = []
-        # This stores the info of each mode i>1 in stats_mode_lines[i] and in
-        # i=0 the lines previous to the modes, in the multi-modal case or the
-        # info of the only mode, in the mono-modal case
-        stats_mode_lines[i].append(line)
-    assert n_modes == max(stats_mode_lines.keys()), (
+    stats_mode_lines = [[]]
+    lines_sigma = [None]
+    lines_MAP = [None]
+    with open(base_name+name_stats, 'r') as stats_file:
+        for line in stats_file:
+            match = re_stats_line.search(line)
+            tag = match.lastgroup if match else None
+            if tag == 'logZ':
+                global_logZ, global_logZ_err = [
+                    float(a.strip()) for a in
+                    line.split(':')[1].split('+/-')]
+            elif tag == 'n_modes':
+                n_modes = int(line.split(':')[1].strip())
+            elif tag == 'mode':
+                stats_mode_lines.append([])
+                lines_sigma.append(None)
+                lines_MAP.append(None)
+            elif tag == 'sigma':
+                lines_sigma[-1] = len(stats_mode_lines[-1])+1
+            elif tag == 'MAP':
+                lines_MAP[-1] = len(stats_mode_lines[-1])+2
+            # This stores the info of each mode i>1 in stats_mode_lines[i] and
+            # in i=0 the lines previous to the modes, in the multi-modal case
+            # or the info of the only mode, in the mono-modal case
+            stats_mode_lines[-1].append(line)
+    assert n_modes == len(stats_mode_lines)-1, (
         'Something is wrong... (strange error n.1)')
 
-    # Prepare the accepted-points file -- modes are separated by 2 line breaks
-    accepted_name = base_name + (name_post_sep if multimodal else name_post)
-    with open(accepted_name, 'r') as accepted_file:
-        mode_lines = [a for a in ''.join(accepted_file.readlines()).split('\n\n')
-                      if a != '']
+    # Read the accepted points -- modes are separated by 2 line breaks. Each
+    # mode is parsed as soon as it is read, so only the arrays are kept, and
+    # not the text. They are all read before any output is written, so that
+    # a corrupt file does not leave some of the mode subfolders behind.
+    columns = 2+NS_arguments['n_params']
     if multimodal:
-        mode_lines = [[]] + mode_lines
-    assert len(mode_lines) == 1+n_modes, 'Something is wrong... (strange error n.2)'
+        with open(base_name+name_post_sep, 'r') as accepted_file:
+            modes_data = [None] + [
+                read_NS_mode(text, columns)
+                for text in iter_blank_separated(accepted_file)]
+    else:
+        # Only one mode: read it directly as a table
+        modes_data = [read_NS_table(base_name+name_post, columns)]
+    assert len(modes_data) == 1+n_modes, 'Something is wrong... (strange error n.2)'
 
 # TODO: prepare total and rejected chain
 
+    # Information of the log.param parameter lines which does not depend on the
+    # mode: line number, minimum, maximum, scale and role
+    logparam_data = [(param, param_lines[param], param_data[param][1],
+                      param_data[param][2], param_data[param][4],
+                      param_data[param][5]) for param in param_names]
+
     # Process each mode:
     ini = 1 if multimodal else 0
     for i in range(ini, 1+n_modes):
@@ -397,59 +561,55 @@ def from_NS_output_to_chains(folder):
             os.makedirs(mode_subfolder)
 
         # Add ACCEPTED points
-        mode_data = np.array(mode_lines[i].split(), dtype='float64')
-        columns = 2+NS_arguments['n_params']
-        mode_data = mode_data.reshape([mode_data.shape[0]/columns, columns])
+        mode_data = modes_data[i]
         # Rearrange: sample-prob | -2*loglik | params (clustering first)
         #       ---> sample-prob |   -loglik | params (log.param order)
-        mode_data[:, 1]  = mode_data[:, 1] / 2.
-        mode_data[:, 2:] = mode_data[:, [2+j for j in columns_reorder]]
-        np.savetxt(os.path.join(mode_subfolder, name_chain_acc),
-                   mode_data, fmt='%.6e')
+        mode_data[:, 1]  /= 2.
+        mode_data[:, 2:] = mode_data[:, columns_reorder]
+        write_NS_table(os.path.join(mode_subfolder, name_chain_acc), mode_data)
+        # Binary copy, which can be loaded without any text parsing
+        if binary:
+            np.save(os.path.join(mode_subfolder, name_chain_acc_npy),
+                    mode_data)
 
         # If we are not in the multimodal case, we are done!
         if not multimodal:
             break
-        # In the multimodal case, we want to write a log.param for each mod
-        this_log_lines = copy(log_lines)
+        # In the multimodal case, we want to write a log.param for each mod,
+        # based on the original one, in which only the parameter lines change
+        new_lines = {}
 
         # Get the necessary info of the parameters:
         #  -- max_posterior (MAP), sigma  <---  stats.dat file
-        for j, line in enumerate(stats_mode_lines[i]):
-            if 'Sigma' in line:
-                line_sigma = j+1
-            if 'MAP' in line:
-                line_MAP = j+2
+        line_sigma, line_MAP = lines_sigma[i], lines_MAP[i]
         MAPs   = {}
         sigmas = {}
         for j, param in enumerate(NS_param_names):
-            n, MAP = stats_mode_lines[i][line_MAP+j].split()
-            assert int(n) == j+1,  'Something is wrong... (strange error n.3)'
-            MAPs[param] = MAP
-            n, mean, sigma = stats_mode_lines[i][line_sigma+j].split()
-            assert int(n) == j+1,  'Something is wrong... (strange error n.4)'
-            sigmas[param] = sigma
+            # Lines are "number value" and "number mean sigma": keep the last
+            # field. The checks are entirely done inside the asserts, so that
+            # they are skipped when running with "python -O"
+            MAP_line = stats_mode_lines[i][line_MAP+j]
+            sigma_line = stats_mode_lines[i][line_sigma+j]
+            assert int(MAP_line.split()[0]) == j+1, (
+                'Something is wrong... (strange error n.3)')
+            assert int(sigma_line.split()[0]) == j+1, (
+                'Something is wrong... (strange error n.4)')
+            MAPs[param] = MAP_line.rsplit(None, 1)[1]
+            sigmas[param] = sigma_line.rsplit(None, 1)[1]
         #  -- minimum rectangle containing the mode (only clustering params)
-        mins = {}
-        maxs = {}
-        for param in NS_arguments['clustering_params']:
-            # Notice that in the next line we use param_names and not
-            # NS_param_names: the chain lines have already been reordered
-            values = mode_data[:, 2+param_names.index(param)]
-            mins[param] = min(values)
-            maxs[param] = max(values)
+        # Notice that in the next line we use param_names and not
+        # NS_param_names: the chain lines have already been reordered
+        values = mode_data[:, [2+param_index[param] for param in
+                               NS_arguments['clustering_params']]]
+        mins = dict(zip(NS_arguments['clustering_params'], values.min(axis=0)))
+        maxs = dict(zip(NS_arguments['clustering_params'], values.max(axis=0)))
         # Create the log.param file
-        for param in param_names:
-            if param in NS_arguments['clustering_params']:
+        for param, j, mini, maxi, scaling, ptype in logparam_data:
+            if param in clustering_params:
                 mini, maxi = '%.6e'%mins[param], '%.6e'%maxs[param]
-            else:
-                mini, maxi = param_data[param][1], param_data[param][2]
-            scaling = param_data[param][4]
-            ptype   = param_data[param][5]
-            line = pre+"'"+param+"'"+pos
-            values = [MAPs[param], mini, maxi, sigmas[param], scaling, ptype]
-            line += ' = [' + ', '.join(values) + ']\n'
-            this_log_lines[param_lines[param]] = line
+            new_lines[j] = logparam_line % (
+                param, MAPs[param], mini, maxi, sigmas[param], scaling, ptype)
         # Write it!
         with open(os.path.join(mode_subfolder, 'log.param'), 'w') as log_file:
-            log_file.writelines(this_log_lines)
+            log_file.writelines(new_lines.get(j, line)
+                                for j, line in enumerate(log_lines))
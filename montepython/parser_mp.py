@@ -540,6 +540,10 @@ def create_parser():
         <**>--want-covmat<**> : bool
             <++>calculate the covariant matrix when analyzing the chains.<++>
             Warning: this will interfere with ongoing runs utilizing update mode (*OPT*) (flag)<++>
+        <**>--save-npy<**> : bool
+            <++>when translating a Nested Sampling subfolder, store as well a
+            binary copy of the chains in NumPy's .npy format<++>, in double
+            precision, that can be loaded with numpy.load (*OPT*) (flag)<++>
         <**>--gaussian-smoothing<**> : float
             <++>width of gaussian smoothing for plotting posteriors<++>,
             in units of bin size, increase for smoother data<++>
@@ -723,6 +727,9 @@ def create_parser():
     # -- calculate the covariant matrix when analyzing the chains
     infoparser.add_argument('--want-covmat', help=helpdict['want-covmat'],
                             dest='want_covmat', action='store_true')
+    # -- store a binary copy of the chains translated from Nested Sampling
+    infoparser.add_argument('--save-npy', help=helpdict['save-npy'],
+                            dest='save_npy', action='store_true')
     # -------------------------------------
     # Further customization
     # -- fontsize of plots (defaulting to 16)
@@ -7,11 +7,13 @@ to run it, do
 import unittest
 import nose
 import os
+import sys
 import datetime
 import shutil
 import re
 import numpy as np
 from itertools import count
+from functools import partial
 import warnings
 # This discards warning messages (maybe this should be tuned to discard only
 # the ones specifically asked by this code..)
@@ -506,5 +508,249 @@ class Test09MPI(TestMontePython):
     pass
 
 
+class Test10NestedSamplingConversion(TestMontePython):
+    """
+    Check the helpers translating the MultiNest output into chains
+    """
+    @classmethod
+    def setUpClass(cls):
+        # PyMultiNest is optional, and imported by the nested_sampling module
+        try:
+            from montepython import nested_sampling
+        except ImportError:
+            raise unittest.SkipTest('PyMultiNest is not installed')
+        cls.NS = nested_sampling
+
+    def setUp(self):
+        self.date = str(datetime.date.today())
+
+    def tearDown(self):
+        del self.date
+
+    def without_pandas(self, function, *args):
+        """Call function with pandas hidden, to test the numpy fallbacks"""
+        # Setting the entry of pandas in sys.modules to None makes its import
+        # fail
+        pandas_module = sys.modules.get('pandas')
+        sys.modules['pandas'] = None
+        try:
+            return function(*args)
+        finally:
+            if pandas_module is None:
+                del sys.modules['pandas']
+            else:
+                sys.modules['pandas'] = pandas_module
+
+    def test_write_table_as_savetxt(self):
+        """Are chains written as with numpy.savetxt, even with nan and inf?"""
+        folder = os.path.join('tests', 'test_NS_output_%s' % self.date)
+        os.makedirs(folder)
+        try:
+            array = np.array([[1., np.nan, -np.inf],
+                              [np.inf, 2.5e-300, -1.234567891]])
+            expected = os.path.join(folder, 'expected.txt')
+            np.savetxt(expected, array, fmt='%.6e')
+            # With pandas, if installed, and without
+            written = os.path.join(folder, 'written.txt')
+            self.NS.write_NS_table(written, array)
+            fallback = os.path.join(folder, 'fallback.txt')
+            self.without_pandas(self.NS.write_NS_table, fallback, array)
+            with open(expected, 'r') as expected_file:
+                expected_text = expected_file.read()
+            for path in [written, fallback]:
+                with open(path, 'r') as written_file:
+                    self.assertEqual(written_file.read(), expected_text)
+        finally:
+            shutil.rmtree(folder)
+
+    def test_read_table(self):
+        """Are truncated lines and malformed numbers detected in tables?"""
+        folder = os.path.join('tests', 'test_NS_output_%s' % self.date)
+        os.makedirs(folder)
+        try:
+            path = os.path.join(folder, 'table.txt')
+            with open(path, 'w') as table_file:
+                table_file.write('1 2 NaN 4\n5 6 7 -Infinity\n')
+            for function in [self.NS.read_NS_table,
+                             partial(self.without_pandas,
+                                     self.NS.read_NS_table)]:
+                table = function(path, 4)
+                self.assertEqual(table.shape, (2, 4))
+                self.assertTrue(np.isnan(table[0, 2]))
+                self.assertEqual(table[1, 3], -np.inf)
+                # Wrong number of columns
+                self.assertRaises(io_mp.AnalyzeError, function, path, 5)
+            # Last line truncated, as left by a killed run, and Fortran
+            # exponent without 'E'
+            for content in ['1 2 3 4\n5 6 7 8\n9 10\n',
+                            '1 2 3 4\n5 0.1234-310 7 8\n']:
+                with open(path, 'w') as table_file:
+                    table_file.write(content)
+                self.assertRaises(io_mp.AnalyzeError,
+                                  self.NS.read_NS_table, path, 4)
+                self.assertRaises(io_mp.AnalyzeError, self.without_pandas,
+                                  self.NS.read_NS_table, path, 4)
+        finally:
+            shutil.rmtree(folder)
+
+    def test_read_mode(self):
+        """Are modes read fully, and malformed numbers detected?"""
+        mode = self.NS.read_NS_mode('1 2 3\n4 5 6\n', 3)
+        self.assertEqual(mode.shape, (2, 3))
+        self.assertEqual(mode[1, 2], 6.)
+        # Fortran exponent without 'E', in the middle or at the end of a line
+        self.assertRaises(
+            io_mp.AnalyzeError, self.NS.read_NS_mode,
+            '1 0.1234-310 3\n4 5 6\n', 3)
+        self.assertRaises(
+            io_mp.AnalyzeError, self.NS.read_NS_mode,
+            '1 2 3\n4 5 6\n7 8 0.1234-310\n1 2 3\n4 5 6\n7 8 9\n', 3)
+        # Missing column
+        self.assertRaises(
+            io_mp.AnalyzeError, self.NS.read_NS_mode,
+            '1 2 3\n4 5\n', 3)
+
+    def test_logparam_line_regexp(self):
+        """Are the parameter lines of log.param recognised?"""
+        regexp = self.NS.re_logparam_line
+        match = regexp.match(
+            "data.parameters['omega_b'] = [2.2, 1.8, 3, 0.02, 0.01, 'cosmo']")
+        self.assertEqual(match.group(1), 'omega_b')
+        # The closing bracket is not part of the last value
+        self.assertEqual([a.strip() for a in match.group(2).split(',')],
+                         ['2.2', '1.8', '3', '0.02', '0.01', "'cosmo'"])
+        match = regexp.match(
+            '  data.parameters[ "A_s" ]  =[1, None, None, 0, 1e-9, "cosmo"]')
+        self.assertEqual(match.group(1), 'A_s')
+        self.assertEqual(match.group(2), '1, None, None, 0, 1e-9, "cosmo"')
+        # Commented lines and other lines are ignored
+        self.assertIsNone(regexp.match(
+            "#data.parameters['h'] = [0.7, 0.5, 0.9, 0.01, 1, 'cosmo']\n"))
+        self.assertIsNone(regexp.match(
+            "data.cosmo_arguments['output'] = 'mPk'\n"))
+
+    def test_stats_line_regexp(self):
+        """Are the lines of the MultiNest stats.dat file classified?"""
+        lines = [
+            ('Nested Sampling Global Log-Evidence           :  '
+             '-0.219471475812665652E+02  +/-   0.141837946389218117E+00',
+             'logZ'),
+            ('Nested Importance Sampling Global Log-Evidence:  '
+             '-0.218471475812665652E+02  +/-   0.141837946389218117E+00',
+             None),
+            ('Total Modes Found:            2', 'n_modes'),
+            ('Mode   1', 'mode'),
+            ('Strictly Local Log-Evidence                    '
+             '-0.225127865498723445E+02  +/-   0.186730174316468624E+00',
+             None),
+            ('Dim No.       Mean        Sigma', 'sigma'),
+            ('    1    0.499896551659327813E+00    0.101286549863154937E+00',
+             None),
+            ('Maximum Likelihood Parameters', None),
+            ('Dim No.        Parameter', None),
+            ('MAP Parameters', 'MAP'),
+            ('', None)]
+        for line, tag in lines:
+            match = self.NS.re_stats_line.search(line)
+            self.assertEqual(match.lastgroup if match else None, tag)
+
+    def test_multimodal_conversion(self):
+        """Are the chains and log.param of each mode correctly written?"""
+        folder = os.path.join('tests', 'test_NS_conversion_%s' % self.date)
+        NS_folder = os.path.join(folder, 'NS')
+        os.makedirs(NS_folder)
+        base_name = os.path.join(NS_folder, os.path.basename(folder))
+        # Parameters, in log.param order: y, x (for the clustering) and d
+        # (derived). MultiNest puts the clustering parameters first.
+        log_lines = [
+            "#-----CLASS v2.4.3-----\n",
+            "\n",
+            "data.experiments=['fake']\n",
+            "data.parameters['y'] = [0.5, 0, 1, 0.1, 1, 'nuisance']\n",
+            'data.parameters["x"] = [0.2, -1, 1, 0.1, 1, "cosmo"]\n',
+            "#data.parameters['z'] = [0, 0, 1, 0.1, 1, 'cosmo']\n",
+            "data.parameters['d'] = [1, None, None, 0, 1, 'derived']\n",
+            "data.N=10\n"]
+        files = {
+            os.path.join(folder, 'log.param'): ''.join(log_lines),
+            base_name+'.arguments': '\n'.join([
+                'n_dims = 2', 'n_params = 3', 'multimodal = True',
+                'clustering_params = x']) + '\n',
+            base_name+'.paramnames': 'x\ny\nd',
+            base_name+'-post_separate.dat': '\n'.join([
+                '0.3 4.0 -0.6 0.1 1.0',
+                '0.7 2.0 -0.4 0.2 2.0',
+                '', '',
+                '0.5 6.0 0.4 0.3 3.0',
+                '0.5 8.0 0.6 0.4 4.0']) + '\n'}
+        stats_lines = [
+            'Nested Sampling Global Log-Evidence           :  '
+            '-0.2E+01  +/-   0.1E+00',
+            'Nested Importance Sampling Global Log-Evidence:  '
+            '-0.2E+01  +/-   0.1E+00',
+            '', 'Total Modes Found:            2', '', '']
+        for mode in [1, 2]:
+            stats_lines += [
+                'Mode   %d' % mode,
+                'Strictly Local Log-Evidence   -0.3E+01  +/-   0.1E+00',
+                'Local Log-Evidence            -0.3E+01  +/-   0.1E+00',
+                '',
+                'Dim No.       Mean        Sigma']
+            stats_lines += ['    %d    %d.0E-01    %d.1E-02' % (j, mode, j)
+                            for j in [1, 2, 3]]
+            stats_lines += ['', 'Maximum Likelihood Parameters',
+                            'Dim No.        Parameter']
+            stats_lines += ['    %d    9.9E-01' % j for j in [1, 2, 3]]
+            stats_lines += ['', 'MAP Parameters', 'Dim No.        Parameter']
+            stats_lines += ['    %d    %d.%dE-01' % (j, j, mode)
+                            for j in [1, 2, 3]]
+            stats_lines += ['', '']
+        files[base_name+'-stats.dat'] = '\n'.join(stats_lines) + '\n'
+        try:
+            for path, content in files.items():
+                with open(path, 'w') as output:
+                    output.write(content)
+            self.NS.from_NS_output_to_chains(NS_folder)
+
+            # Chains: sample-prob, -loglik, then parameters in log.param order
+            chain = np.loadtxt(os.path.join(
+                folder, 'mode_1', 'chain_NS__accepted.txt'))
+            self.assertTrue(np.allclose(chain, [
+                [0.3, 2.0, 0.1, -0.6, 1.0],
+                [0.7, 1.0, 0.2, -0.4, 2.0]]))
+            chain = np.loadtxt(os.path.join(
+                folder, 'mode_2', 'chain_NS__accepted.txt'))
+            self.assertTrue(np.allclose(chain, [
+                [0.5, 3.0, 0.3, 0.4, 3.0],
+                [0.5, 4.0, 0.4, 0.6, 4.0]]))
+            self.assertFalse(os.path.exists(os.path.join(
+                folder, 'mode_1', 'chain_NS__accepted.npy')))
+
+            # log.param: MAP and sigma of each mode, bounds of the mode for
+            # the clustering parameter, other lines untouched
+            with open(os.path.join(folder, 'mode_1', 'log.param')) as log:
+                self.assertEqual(log.readlines(), log_lines[:3] + [
+                    "data.parameters['y'] = "
+                    "[2.1E-01, 0, 1, 2.1E-02, 1, 'nuisance']\n",
+                    "data.parameters['x'] = [1.1E-01, -6.000000e-01, "
+                    "-4.000000e-01, 1.1E-02, 1, \"cosmo\"]\n",
+                    log_lines[5],
+                    "data.parameters['d'] = "
+                    "[3.1E-01, None, None, 3.1E-02, 1, 'derived']\n",
+                    log_lines[7]])
+            with open(os.path.join(folder, 'mode_2', 'log.param')) as log:
+                self.assertEqual(log.readlines(), log_lines[:3] + [
+                    "data.parameters['y'] = "
+                    "[2.2E-01, 0, 1, 2.1E-02, 1, 'nuisance']\n",
+                    "data.parameters['x'] = [1.2E-01, 4.000000e-01, "
+                    "6.000000e-01, 1.1E-02, 1, \"cosmo\"]\n",
+                    log_lines[5],
+                    "data.parameters['d'] = "
+                    "[3.2E-01, None, None, 3.1E-02, 1, 'derived']\n",
+                    log_lines[7]])
+        finally:
+            shutil.rmtree(folder)
+
+
 if __name__ == '__main__':
     nose.runmodule()